@@ -1,16 +1,20 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 from fpdf import FPDF
-import tempfile
 import os
 from io import BytesIO
 import chardet
+import pymupdf
 import pdfplumber
 from pdf2image import convert_from_bytes
 import pytesseract
-import io
+from pytesseract import Output
+from PIL import Image
 import re
+import codecs
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 
 # -------------------------
 # Page config
@@ -53,63 +57,231 @@ def detect_bank(pdf_text):
     return None
 
 # -------------------------
-# Smart PDF/OCR parser
+# Transaction patterns
 # -------------------------
-def parse_pdf_smart(file_bytes):
-    rows = []
-    text_for_bank = ""
+DATE_RE = re.compile(
+    r"\d{2}[/-]\d{2}[/-]\d{2,4}"      # 02/09/2025 or 02-09-2025
+    r"|\d{4}[/-]\d{2}[/-]\d{2}"       # 2025/09/02
+    r"|\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[ -]\d{1,2}[, ]*\d{4}\b"  # Sep 2, 2025
+)
+AMOUNT_RE = re.compile(r"-?\d[\d,]*(?:\.\d{2})?(?!.*\d)")  # last number on the line, e.g. -1,234.56
+
+# Keyword categories, one capture group each. Every branch is a lookahead anchored at the
+# start (each rescans the description), so the first category in this list wins even if
+# another keyword appears earlier. DOTALL lets multi-line descriptions match past a newline.
+CATEGORY_RE = re.compile(
+    r"^(?:(?=.*(shell|fuel))"
+    r"|(?=.*(salary|payroll))"
+    r"|(?=.*(rent))"
+    r"|(?=.*(tax|vat)))",
+    re.IGNORECASE | re.DOTALL,
+)
+CATEGORY_LABELS = ["Fuel Expense", "Payroll Expense", "Rent Expense", "Tax"]
 
-    # --- Try text extraction with pdfplumber ---
-    try:
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            for i, page in enumerate(pdf.pages):
-                text = page.extract_text()
-                if text:
-                    if i == 0:
-                        text_for_bank += text  # first page for bank detection
-                    for line in text.split("\n"):
-                        rows.append(line)
-    except:
-        pass
-
-    # --- Fallback to OCR for scanned PDFs ---
-    if not rows:
-        images = convert_from_bytes(file_bytes)
-        for image in images:
-            text = pytesseract.image_to_string(image)
-            if images.index(image) == 0:
-                text_for_bank += text
-            rows.extend(text.split("\n"))
+# Explicit formats tried before falling back to per-value (format="mixed") parsing
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%Y/%m/%d")
+
+# Pages with less extracted text than this are treated as scanned and OCR'd
+MIN_PAGE_TEXT_CHARS = 20
+
+# OCR settings: 150 DPI grayscale is enough for statement text; PSM 6 = single uniform block
+OCR_DPI = 150
+TESSERACT_CONFIG = "--oem 1 --psm 6 -c load_system_dawg=0 -c load_freq_dawg=0"
+# Pages are stitched into tall composites so Tesseract starts once per batch, not per page;
+# keep composites under Tesseract's 32767 px image dimension limit
+OCR_MAX_COMPOSITE_HEIGHT = 30000
+
+# -------------------------
+# OCR
+# -------------------------
+def stitch_pages(images):
+    canvas = Image.new("L", (max(im.width for im in images), sum(im.height for im in images)), 255)
+    offsets = []
+    top = 0
+    for im in images:
+        canvas.paste(im, (0, top))
+        offsets.append(top)
+        top += im.height
+    return canvas, offsets
+
+def ocr_composite(canvas, offsets):
+    # One Tesseract call for the whole composite; words are mapped back to their page by y offset
+    words = pytesseract.image_to_data(canvas, config=TESSERACT_CONFIG, output_type=Output.DICT)
+    lines = {}
+    for top, block, par, line, word in zip(
+        words["top"], words["block_num"], words["par_num"], words["line_num"], words["text"]
+    ):
+        if word.strip():
+            page = bisect_right(offsets, top) - 1
+            lines.setdefault((page, block, par, line), []).append(word)
+    texts = [[] for _ in offsets]
+    for (page, *_), line_words in sorted(lines.items()):
+        texts[page].append(" ".join(line_words))
+    return ["\n".join(page_lines) for page_lines in texts]
+
+def ocr_batch(images):
+    # Stitch inside the worker so only the composites being OCR'd are held in memory
+    return ocr_composite(*stitch_pages(images))
+
+def render_pages(file_bytes, page_numbers):
+    # One pdftoppm run per contiguous run of pages, each using all cores
+    images = []
+    start = 0
+    for i in range(1, len(page_numbers) + 1):
+        if i == len(page_numbers) or page_numbers[i] != page_numbers[i - 1] + 1:
+            images.extend(convert_from_bytes(
+                file_bytes, dpi=OCR_DPI, grayscale=True, thread_count=os.cpu_count(),
+                first_page=page_numbers[start], last_page=page_numbers[i - 1],
+            ))
+            start = i
+    return images
+
+def ocr_images(images):
+    if not images:
+        return []
+    # Split pages into one batch per worker, capped by composite height
+    workers = min(len(images), os.cpu_count() or 1)
+    per_batch = -(-len(images) // workers)
+    batches, batch, height = [], [], 0
+    for image in images:
+        if batch and (len(batch) == per_batch or height + image.height > OCR_MAX_COMPOSITE_HEIGHT):
+            batches.append(batch)
+            batch, height = [], 0
+        batch.append(image)
+        height += image.height
+    batches.append(batch)
+
+    if len(batches) == 1:
+        return ocr_batch(batches[0])
+    # pytesseract runs the tesseract binary in a subprocess, so threads run batches in parallel
+    # without pickling images to worker processes; the height cap can add batches, so cap
+    # concurrent Tesseract runs at the core count
+    with ThreadPoolExecutor(max_workers=min(len(batches), workers)) as ex:
+        return [text for texts in ex.map(ocr_batch, batches) for text in texts]
+
+# -------------------------
+# Transaction extraction
+# -------------------------
+def extract_transactions(text):
+    # Vectorized over all lines of a page: keep lines that have both a date and an amount
+    lines = pd.Series(text.split("\n"), dtype=object)
+    dates = lines.str.extract(f"({DATE_RE.pattern})", expand=False)
+    amounts = lines.str.extract(f"({AMOUNT_RE.pattern})", expand=False)
+    found = dates.notna() & amounts.notna()
+    lines, dates, amounts = lines[found], dates[found], amounts[found]
+    desc = lines.str.replace(DATE_RE, "", n=1, regex=True).str.replace(AMOUNT_RE, "", n=1, regex=True).str.strip()
+    return pd.DataFrame({
+        "Date": dates,
+        "Description": desc,
+        "Amount": amounts.str.replace(",", "", regex=False).astype(float),
+    })
+
+def parse_dates(dates):
+    parsed = pd.to_datetime(dates, format=DATE_FORMATS[0], errors="coerce")
+    for fmt in DATE_FORMATS[1:]:
+        missing = parsed.isna()
+        if not missing.any():
+            return parsed
+        parsed[missing] = pd.to_datetime(dates[missing], format=fmt, errors="coerce")
+    missing = parsed.isna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(dates[missing], format="mixed", errors="coerce", dayfirst=True)
+    return parsed
+
+# -------------------------
+# PDF text extractors (yield page number, text)
+# -------------------------
+def fitz_page_lines(page):
+    # get_text("text") puts each table cell on its own line; rebuild visual rows from word
+    # boxes instead, joining words whose vertical centres fall within half a word height
+    rows = []  # [row centre, [(x0, word), ...]]
+    for x0, y0, x1, y1, word, *_ in sorted(page.get_text("words"), key=lambda w: (w[1], w[0])):
+        centre = (y0 + y1) / 2
+        if rows and abs(centre - rows[-1][0]) <= (y1 - y0) / 2:
+            rows[-1][1].append((x0, word))
+        else:
+            rows.append([centre, [(x0, word)]])
+    return "\n".join(" ".join(word for _, word in sorted(words)) for _, words in rows)
+
+def fitz_page_texts(file_bytes, pages=None):
+    with pymupdf.open(stream=file_bytes, filetype="pdf") as doc:
+        for n in pages or range(1, doc.page_count + 1):
+            yield n, fitz_page_lines(doc[n - 1])
+
+def pdfplumber_page_texts(file_bytes, pages=None):
+    with pdfplumber.open(BytesIO(file_bytes), pages=pages) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text()
+            page.close()  # release cached pdfminer objects before the next page
+            yield page.page_number, text
+
+# -------------------------
+# Smart PDF/OCR parser
+# -------------------------
+@st.cache_data(show_spinner=False)
+def parse_pdf_smart(file_bytes, pages=None):
+    # pages: optional list of 1-based page numbers to parse (default: all)
+
+    # --- Try text extraction with PyMuPDF, then pdfplumber, one page at a time ---
+    no_transactions = None  # result from an extractor that found text but no transactions
+    for page_texts in (fitz_page_texts, pdfplumber_page_texts):
+        text_for_bank = ""
+        page_data = []   # transactions per parsed page, in page order
+        ocr_pages = []   # (slot in page_data, 1-based page number)
+        try:
+            for slot, (n, text) in enumerate(page_texts(file_bytes, pages)):
+                if text and len(text.strip()) > MIN_PAGE_TEXT_CHARS:
+                    if slot == 0:
+                        text_for_bank = text  # first page for bank detection
+                    page_data.append(extract_transactions(text))
+                else:
+                    page_data.append(None)
+                    ocr_pages.append((slot, n))
+        except:
+            page_data = []
+            ocr_pages = []
+        if not page_data:
+            continue  # extractor could not open the file
+        if len(ocr_pages) == len(page_data):
+            break  # no text layer at all; every page goes to OCR below
+        if any(frame is not None and not frame.empty for frame in page_data):
+            break  # text layer yielded transactions
+        no_transactions = (text_for_bank, page_data, ocr_pages)
+    if not page_data and no_transactions:
+        text_for_bank, page_data, ocr_pages = no_transactions
+
+    # --- Fallback to OCR, only for scanned pages ---
+    if not page_data:
+        if pages:
+            images = render_pages(file_bytes, pages)
+        else:
+            images = convert_from_bytes(file_bytes, dpi=OCR_DPI, grayscale=True, thread_count=os.cpu_count())
+        texts = ocr_images(images)
+        text_for_bank = texts[0] if texts else ""
+        page_data = [extract_transactions(text) for text in texts]
+    elif ocr_pages:
+        images = render_pages(file_bytes, [n for _, n in ocr_pages])
+        for (slot, _), text in zip(ocr_pages, ocr_images(images)):
+            if slot == 0:
+                text_for_bank = text
+            page_data[slot] = extract_transactions(text)
+
+    frames = [frame for frame in page_data if frame is not None]
 
     # --- Detect bank ---
     bank_name = detect_bank(text_for_bank)
     rules = bank_rules.get(bank_name, {})
 
-    # --- Extract columns ---
-    data = []
-    date_regex = (
-        r"\d{2}[/-]\d{2}[/-]\d{2,4}"      # 02/09/2025 or 02-09-2025
-        r"|\d{4}[/-]\d{2}[/-]\d{2}"       # 2025/09/02
-        r"|\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[ -]\d{1,2}[, ]*\d{4}\b"  # Sep 2, 2025
-    )
-    amount_regex = r"-?\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})?"
-
-    for row in rows:
-        date_match = re.search(date_regex, row)
-        amount_match = re.findall(amount_regex, row.replace(",", ""))
-        if date_match and amount_match:
-            date_val = date_match.group()
-            amount_val = float(amount_match[-1].replace(",", ""))
-            desc = row.replace(date_val, "").replace(str(amount_match[-1]), "").strip()
-            data.append([date_val, desc, amount_val])
-
-    df = pd.DataFrame(data, columns=["Date", "Description", "Amount"])
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=["Date", "Description", "Amount"])
 
     # --- Apply bank-specific date format if available ---
     if "date_format" in rules:
         df["Date"] = pd.to_datetime(df["Date"], format=rules["date_format"], errors="coerce")
     else:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce", dayfirst=True)
+        df["Date"] = parse_dates(df["Date"])
 
     # --- Remove rows with unparsed dates ---
     df = df.dropna(subset=["Date"]).reset_index(drop=True)
@@ -122,6 +294,75 @@ def parse_pdf_smart(file_bytes):
 
     return df, bank_name
 
+# -------------------------
+# Cached loaders / transforms (keyed on file bytes, reused across reruns)
+# -------------------------
+def decodes(raw_bytes, encoding):
+    try:
+        raw_bytes.decode(encoding)
+        return True
+    except (UnicodeDecodeError, LookupError, TypeError):
+        return False
+
+def detect_full_encoding(raw_bytes):
+    # Slow path: chardet over the whole file, with cp1252 (then latin-1) as the last resort
+    encoding = chardet.detect(raw_bytes)['encoding']
+    if decodes(raw_bytes, encoding):
+        return encoding
+    return "cp1252" if decodes(raw_bytes, "cp1252") else "latin-1"
+
+@st.cache_data(show_spinner=False)
+def load_csv(raw_bytes):
+    head = raw_bytes[:65536]  # sample only, chardet on the full file is slow
+    if head.startswith(b"\xef\xbb\xbf"):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            # incremental decode tolerates a multi-byte char cut at the sample edge
+            codecs.getincrementaldecoder("utf-8")().decode(head)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = chardet.detect(head)['encoding']
+    # The sample can miss non-UTF-8 bytes further down (e.g. a cp1252 merchant name);
+    # confirm on the whole file, which is a C-speed check, before trusting the guess
+    if not decodes(raw_bytes, encoding):
+        encoding = detect_full_encoding(raw_bytes)
+    try:
+        df = pd.read_csv(BytesIO(raw_bytes), encoding=encoding, engine="pyarrow")
+    except pd.errors.ParserError:
+        # pyarrow is strict about ragged rows (e.g. bank preamble lines); the C engine is more forgiving
+        return pd.read_csv(BytesIO(raw_bytes), encoding=encoding)
+    # pyarrow returns undecodable text as binary (bytes) columns instead of raising; treat as failure
+    for col in df.select_dtypes("object"):
+        values = df[col].dropna()
+        if not values.empty and isinstance(values.iloc[0], bytes):
+            return pd.read_csv(BytesIO(raw_bytes), encoding=detect_full_encoding(raw_bytes))
+    return df
+
+@st.cache_data(show_spinner=False)
+def load_excel(raw_bytes):
+    return pd.read_excel(BytesIO(raw_bytes), engine="calamine")  # Rust reader, handles .xls and .xlsx
+
+@st.cache_data(show_spinner=False)
+def categorize(df):
+    matches = df["Description"].str.extract(CATEGORY_RE)  # one str.extract call, one column per category
+    conds = [matches[i].notna() for i in range(len(CATEGORY_LABELS))] + [df["Amount"] > 0]
+    choices = CATEGORY_LABELS + ["Sales Income"]
+    return np.select(conds, choices, default="Other Expense")
+
+@st.cache_data(show_spinner=False)
+def build_excel(df, metrics):
+    output = BytesIO()
+    # xlsxwriter serializes much faster than openpyxl. constant_memory is not used:
+    # pandas writes cells column by column, and that mode drops cells written out of row order.
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name="Transactions")
+        pd.DataFrame({
+            "Metric": list(metrics.keys()),
+            "Value": list(metrics.values()),
+        }).to_excel(writer, index=False, sheet_name="Summary")
+    return output.getvalue()
+
 # -------------------------
 # File upload
 # -------------------------
@@ -134,22 +375,17 @@ if uploaded_file:
     try:
         # ---- CSV ----
         if uploaded_file.name.endswith(".csv"):
-            raw_data = uploaded_file.read()
-            result = chardet.detect(raw_data)
-            encoding = result['encoding']
-            uploaded_file.seek(0)
-            df = pd.read_csv(uploaded_file, encoding=encoding)
+            df = load_csv(uploaded_file.getvalue())
             bank_name = None
 
         # ---- Excel ----
         elif uploaded_file.name.endswith((".xls", ".xlsx")):
-            df = pd.read_excel(uploaded_file)
+            df = load_excel(uploaded_file.getvalue())
             bank_name = None
 
         # ---- PDF ----
         elif uploaded_file.name.endswith(".pdf"):
-            uploaded_file.seek(0)
-            df, bank_name = parse_pdf_smart(uploaded_file.read())
+            df, bank_name = parse_pdf_smart(uploaded_file.getvalue())
             if df.empty:
                 st.error("Could not parse any transactions from this PDF. Try exporting CSV/Excel instead.")
                 st.stop()
@@ -168,27 +404,27 @@ if uploaded_file:
     # -------------------------
     # Flexible column detection
     # -------------------------
-    def normalize_col(name):
-        return name.strip().lower().replace(" ", "").replace("_", "")
-
-    df.columns = [normalize_col(c) for c in df.columns]
-
-    col_mapping = {}
-    for c in df.columns:
-        if "date" in c:
-            col_mapping[c] = "Date"
-        elif "description" in c or "details" in c or "transaction" in c:
-            col_mapping[c] = "Description"
-        elif "amount" in c or "value" in c or "debit" in c or "credit" in c:
-            col_mapping[c] = "Amount"
+    # Drop empty columns first so the rest only touches real data
+    df = df.dropna(axis=1, how='all')
+    df.columns = df.columns.astype(str).str.strip().str.lower().str.replace(r"[ _]", "", regex=True)
+
+    column_keywords = (
+        ("date", "Date"),
+        ("description", "Description"),
+        ("details", "Description"),
+        ("transaction", "Description"),
+        ("amount", "Amount"),
+        ("value", "Amount"),
+        ("debit", "Amount"),
+        ("credit", "Amount"),
+    )
+    col_mapping = {c: next((target for key, target in column_keywords if key in c), c) for c in df.columns}
     df.rename(columns=col_mapping, inplace=True)
 
     # -------------------------
-    # Clean duplicate / empty columns
+    # Clean duplicate columns
     # -------------------------
-    df = df.dropna(axis=1, how='all')
     df = df.loc[:, ~df.columns.duplicated()]
-    df.columns = df.columns.str.strip()
 
     if "Date" not in df.columns:
         st.error("No valid 'Date' column detected. Please check your PDF/CSV.")
@@ -197,22 +433,10 @@ if uploaded_file:
     # -------------------------
     # Categorization
     # -------------------------
-    def categorize(description, amount):
-        desc = str(description).lower()
-        if "shell" in desc or "fuel" in desc:
-            return "Fuel Expense"
-        if "salary" in desc or "payroll" in desc:
-            return "Payroll Expense"
-        if "rent" in desc:
-            return "Rent Expense"
-        if any(k in desc for k in ["tax", "vat"]):
-            return "Tax"
-        if amount > 0:
-            return "Sales Income"
-        return "Other Expense"
-
     df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce")
-    df["Category"] = df.apply(lambda row: categorize(row["Description"], row["Amount"]), axis=1)
+    # Arrow-backed strings and a categorical Category speed up the .str and groupby work below
+    df["Description"] = df["Description"].astype("string[pyarrow]")
+    df["Category"] = pd.Categorical(categorize(df))
 
     st.subheader(f"📑 Transactions {'(Bank: ' + bank_name + ')' if bank_name else ''}")
     st.dataframe(df, use_container_width=True)
@@ -220,8 +444,12 @@ if uploaded_file:
     # -------------------------
     # Income Statement
     # -------------------------
-    income = df[df["Category"] == "Sales Income"]["Amount"].sum()
-    expenses = df[df["Category"].str.contains("Expense")]["Amount"].sum()
+    # One pass over the data; every figure below comes from this small per-category Series
+    category_totals = df.groupby("Category", observed=True)["Amount"].sum()
+    expense_totals = category_totals[category_totals.index.str.endswith("Expense")]
+
+    income = category_totals.get("Sales Income", 0.0)
+    expenses = expense_totals.sum()
     net_profit = income + expenses
 
     st.subheader("📊 Income Statement")
@@ -232,8 +460,8 @@ if uploaded_file:
     # -------------------------
     # Balance Sheet (simplified)
     # -------------------------
-    total_assets = df["Amount"].sum()
-    total_liabilities = abs(df[df["Category"].str.contains("Expense")]["Amount"].sum())
+    total_assets = category_totals.sum()
+    total_liabilities = abs(expenses)
     equity = total_assets - total_liabilities
 
     st.subheader("📒 Balance Sheet (Simplified)")
@@ -256,7 +484,7 @@ if uploaded_file:
     # Charts
     # -------------------------
     st.subheader("📊 Charts")
-    expense_df = df[df["Amount"] < 0].groupby("Category")["Amount"].sum().abs()
+    expense_df = df.loc[df["Amount"] < 0].groupby("Category", observed=True)["Amount"].sum().abs()
     if not expense_df.empty:
         st.bar_chart(expense_df)
     cash_flow = df.groupby("Date")["Amount"].sum().cumsum()
@@ -273,6 +501,19 @@ if uploaded_file:
     st.write(f"EV/EBITDA Proxy: {ev_ebitda:,.2f}")
     st.write(f"Revenue Multiple EV: {ev_revenue:,.2f}")
 
+    # Report figures shared by the PDF and Excel exports
+    metrics = {
+        "Revenue": income,
+        "Expenses": expenses,
+        "Net Profit": net_profit,
+        "Assets": total_assets,
+        "Liabilities": total_liabilities,
+        "Equity": equity,
+        "DCF EV": dcf_ev,
+        "EV/EBITDA EV": ev_ebitda,
+        "Revenue Multiple EV": ev_revenue,
+    }
+
     # -------------------------
     # PDF export
     # -------------------------
@@ -282,30 +523,18 @@ if uploaded_file:
         pdf.set_font("Arial", "B", 16)
         pdf.cell(200, 10, "Financial Report", ln=True, align="C")
         pdf.set_font("Arial", "", 12)
-        pdf.cell(0, 10, f"Revenue: {income:,.2f}", ln=True)
-        pdf.cell(0, 10, f"Expenses: {expenses:,.2f}", ln=True)
-        pdf.cell(0, 10, f"Net Profit: {net_profit:,.2f}", ln=True)
-        pdf.cell(0, 10, f"Assets: {total_assets:,.2f}", ln=True)
-        pdf.cell(0, 10, f"Liabilities: {total_liabilities:,.2f}", ln=True)
-        pdf.cell(0, 10, f"Equity: {equity:,.2f}", ln=True)
-        pdf.cell(0, 10, f"DCF EV: {dcf_ev:,.2f}", ln=True)
-        pdf.cell(0, 10, f"EV/EBITDA EV: {ev_ebitda:,.2f}", ln=True)
-        pdf.cell(0, 10, f"Revenue Multiple EV: {ev_revenue:,.2f}", ln=True)
-        tmp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-        pdf.output(tmp_pdf.name)
-        return tmp_pdf.name
+        pdf.multi_cell(0, 10, "\n".join(f"{name}: {value:,.2f}" for name, value in metrics.items()))
+        return bytes(pdf.output())  # fpdf2 returns the document in memory, no temp file needed
 
     if st.button("📥 Download PDF"):
-        pdf_file = create_pdf()
-        with open(pdf_file, "rb") as f:
-            st.download_button("Download PDF", data=f, file_name="report.pdf", mime="application/pdf")
-        os.remove(pdf_file)
+        st.download_button("Download PDF", data=create_pdf(), file_name="report.pdf", mime="application/pdf")
 
     # -------------------------
     # Excel export
     # -------------------------
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Transactions")
-        pd.DataFrame({
-            "Metric": ["Revenue", "Expenses", "Net Profit", "Assets", "Liabilities", "Equ
+    st.download_button(
+        "📥 Download Excel",
+        data=build_excel(df, metrics),
+        file_name="financials.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )